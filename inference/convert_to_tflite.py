@@ -0,0 +1,165 @@
+"""Offline conversion of the Keras classifier to a TFLite FlatBuffer.
+
+Produces the post-training-quantized models loaded by classify_image.py:
+- int8: full-integer model. Calibration uses a representative dataset of sample images run through
+  the same preprocessing as Lambda (resize to 1024x1024, crop upper-center 512x512).
+- float16: weights stored as fp16, float32 input/output. Use if INT8 calibration hurts accuracy.
+
+Note: requires full TensorFlow. Only the resulting .tflite file needs to ship with Lambda.
+
+With --verify <held_out_dir>, the converted model is checked against the Keras model on a separate set of
+held-out images (not the calibration images) and the top-1 agreement rate is reported.
+
+Usage as command-line script:
+    python convert_to_tflite.py <calibration_image_dir> [--num-samples 100] [--output <path>] [--verify <held_out_dir>]
+    python convert_to_tflite.py --quantization float16 [--verify <held_out_dir>]
+"""
+
+import os
+
+import numpy as np
+from PIL import Image
+import tensorflow as tf
+
+from classify_image import predict, resize_and_crop
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+KERAS_MODEL_PATH = os.path.join(SCRIPT_DIR, '..', 'models', '20250713_ett_model_30epochs_resnet_cropped.keras')
+TFLITE_MODEL_PATH = os.path.join(SCRIPT_DIR, '..', 'models', '20250713_ett_model_30epochs_resnet_cropped_{}.tflite')
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def load_sample(image_path):
+    """Load an image and apply the Lambda preprocessing. Returns a (1, 512, 512, 3) float32 array."""
+    with Image.open(image_path) as img:
+        cropped = resize_and_crop(img.convert('RGB'))
+        arr = np.asarray(cropped, dtype=np.float32)
+    return np.expand_dims(arr, axis=0)
+
+
+def list_images(image_dir, num_samples=None):
+    """Return up to num_samples (default: all) image paths from image_dir, sorted for reproducibility."""
+    paths = sorted(
+        os.path.join(image_dir, name)
+        for name in os.listdir(image_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if not paths:
+        raise ValueError(f"No images found in {image_dir}")
+    return paths[:num_samples]
+
+
+def convert(model, calibration_paths):
+    """Convert a Keras model to a full-integer INT8 TFLite FlatBuffer. Returns the model bytes."""
+    def representative_dataset():
+        for path in calibration_paths:
+            yield [load_sample(path)]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    return converter.convert()
+
+
+def convert_float16(model):
+    """Convert a Keras model to a TFLite FlatBuffer with float16 weights. Returns the model bytes.
+
+    Weights are dequantized to float32 at op time, so input/output stay float32.
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    return converter.convert()
+
+
+def build_reference_fn(model):
+    """Wrap the Keras forward pass in a tf.function traced once for a single 512x512x3 image.
+
+    Calling this directly avoids model.predict's per-call tf.data/callback setup and retracing.
+    """
+    infer = tf.function(
+        lambda x: model(x, training=False),
+        input_signature=[tf.TensorSpec([1, 512, 512, 3], tf.float32)],
+    )
+    infer(tf.zeros([1, 512, 512, 3], tf.float32))
+    return infer
+
+
+def verify(model, tflite_model, image_paths):
+    """Return the fraction of images where the TFLite and Keras models predict the same class.
+
+    image_paths should be held out from calibration; calibration images overstate agreement.
+    """
+    interpreter = tf.lite.Interpreter(model_content=tflite_model)
+    interpreter.allocate_tensors()
+    reference = build_reference_fn(model)
+
+    matches = 0
+    for path in image_paths:
+        arr = load_sample(path)
+        expected = int(np.argmax(reference(tf.constant(arr)).numpy(), axis=1)[0])
+        actual = int(np.argmax(predict(interpreter, arr), axis=1)[0])
+        matches += int(expected == actual)
+    return matches / len(image_paths)
+
+
+if __name__ == '__main__':
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Convert the Keras ETT classifier to a quantized TFLite model')
+    parser.add_argument('calibration_dir', nargs='?',
+                        help='Directory of sample images (PNG, JPG) for INT8 calibration')
+    parser.add_argument('--quantization', choices=['int8', 'float16'], default='int8',
+                        help='Post-training quantization scheme')
+    parser.add_argument('--num-samples', type=int, default=100, help='Number of calibration images to use')
+    parser.add_argument('--model', default=KERAS_MODEL_PATH, help='Path to the source .keras model')
+    parser.add_argument('--output', help='Path to write the .tflite model (default: models/..._<quantization>.tflite)')
+    parser.add_argument('--verify', metavar='HELD_OUT_DIR',
+                        help='Compare TFLite predictions against the Keras model on held-out images (PNG, JPG) '
+                             'not used for calibration')
+
+    args = parser.parse_args()
+
+    if args.quantization == 'int8' and not args.calibration_dir:
+        parser.error('calibration_dir is required for int8 quantization')
+    if (args.verify and args.calibration_dir
+            and os.path.realpath(args.verify) == os.path.realpath(args.calibration_dir)):
+        parser.error('--verify needs held-out images, not the calibration directory')
+
+    output_path = args.output or TFLITE_MODEL_PATH.format(args.quantization)
+
+    try:
+        print(f"Loading Keras model: {args.model}")
+        model = tf.keras.models.load_model(args.model)
+
+        if args.quantization == 'int8':
+            calibration_paths = list_images(args.calibration_dir, args.num_samples)
+            print(f"Calibrating with {len(calibration_paths)} images from {args.calibration_dir}")
+            print("Converting to INT8 TFLite...")
+            tflite_model = convert(model, calibration_paths)
+        else:
+            print("Converting to float16 TFLite...")
+            tflite_model = convert_float16(model)
+
+        with open(output_path, 'wb') as f:
+            f.write(tflite_model)
+        print(f"Wrote {output_path} ({len(tflite_model) / 1e6:.1f} MB)")
+
+        if args.verify:
+            held_out_paths = list_images(args.verify)
+            agreement = verify(model, tflite_model, held_out_paths)
+            print(f"Top-1 agreement with Keras model: {agreement:.1%} ({len(held_out_paths)} held-out images)")
+
+        sys.exit(0)
+
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -7,7 +7,7 @@ import json
 import boto3
 import uuid
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 
 s3 = boto3.client('s3')
 dynamodb = boto3.resource('dynamodb')
@@ -55,7 +55,7 @@ def lambda_handler(event, context):
                 's3Key': s3_key,
                 'fileName': file_name,
                 'fileType': file_type,
-                'createdAt': datetime.utcnow().isoformat()
+                'createdAt': datetime.now(timezone.utc).isoformat()
             }
         )
         
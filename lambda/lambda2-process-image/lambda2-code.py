@@ -8,7 +8,8 @@ import json
 import boto3
 import os
 import urllib.parse
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
 from decimal import Decimal
 import io
 
@@ -16,8 +17,15 @@ rekognition = boto3.client('rekognition')
 s3_client = boto3.client('s3')
 dynamodb = boto3.resource('dynamodb')
 
+# Runs S3 transfers and Rekognition calls concurrently with the classifier; every submitted future is waited on
+# before the handler returns, including on error paths (Lambda freezes leftover threads between invocations)
+executor = ThreadPoolExecutor(max_workers=8)
+
 TABLE_NAME = os.environ['TABLE_NAME']
 
+# Rekognition accepts raw image bytes up to 5 MB; larger images must be read from S3
+REKOGNITION_MAX_IMAGE_BYTES = 5 * 1024 * 1024
+
 # Import DICOM libraries
 try:
     import pydicom
@@ -29,21 +37,62 @@ except ImportError as e:
     DICOM_SUPPORT = False
     print(f"DICOM libraries not available: {e}")
 
+# Import the model classifier at init so its model load and warm-up happen before the first request.
+# resize_and_crop is shared with the offline calibration in inference/ so both crop the same region.
+try:
+    from inference.classify_image import classify_arrays, resize_and_crop
+except ImportError as e:
+    classify_arrays = None
+    print(f"Model classifier not available: {e}")
+
+    def resize_and_crop(img, target_size=(1024, 1024), crop_size=(512, 512)):
+        """Fallback copy of inference.classify_image.resize_and_crop; keep the two in sync."""
+        target_w, target_h = target_size
+        crop_w, crop_h = crop_size
+        left = (target_w - crop_w) // 2
+        scale_x = img.width / target_w
+        scale_y = img.height / target_h
+        source_box = (left * scale_x, 0, (left + crop_w) * scale_x, crop_h * scale_y)
+        return img.resize(crop_size, Image.LANCZOS, box=source_box)
+
+# Optional libjpeg-turbo encoder for DICOM -> JPEG (falls back to Pillow)
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB, TJSAMP_420
+    turbojpeg = TurboJPEG()
+    TURBOJPEG_SUPPORT = True
+except Exception as e:
+    TURBOJPEG_SUPPORT = False
+    print(f"TurboJPEG not available, using Pillow JPEG encoder: {e}")
+
 def convert_floats_to_decimals(obj):
-    """Convert all floats in a nested structure to Decimals for DynamoDB"""
-    if isinstance(obj, list):
-        return [convert_floats_to_decimals(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: convert_floats_to_decimals(value) for key, value in obj.items()}
-    elif isinstance(obj, float):
-        return Decimal(str(obj))
-    else:
-        return obj
+    """Convert all floats in a nested structure to Decimals for DynamoDB
+
+    Round-trips through the C JSON encoder/decoder instead of walking the structure in Python;
+    parse_float=Decimal yields the same values as Decimal(str(f)). Non-JSON values are stored as strings.
+    """
+    return json.loads(json.dumps(obj, default=str), parse_float=Decimal)
 
 def is_dicom_file(key):
     """Check if file is a DICOM file based on extension"""
     return key.lower().endswith('.dcm') or key.lower().endswith('.dicom')
 
+def normalize_to_uint8(pixel_array):
+    """Min-max normalize pixel data to the 0-255 range as uint8"""
+    # Normalize in float32 with a single working buffer
+    pixel_min = np.min(pixel_array)
+    pixel_max = np.max(pixel_array)
+    
+    print(f"Pixel value range: {pixel_min} to {pixel_max}")
+    
+    if pixel_max > pixel_min:
+        scale = np.float32(255.0 / (float(pixel_max) - float(pixel_min)))
+        scaled = pixel_array.astype(np.float32)
+        np.subtract(scaled, np.float32(pixel_min), out=scaled)
+        np.multiply(scaled, scale, out=scaled)
+        np.clip(scaled, 0, 255, out=scaled)
+        return scaled.astype(np.uint8)
+    return np.zeros(pixel_array.shape, dtype=np.uint8)
+
 def convert_dicom_to_jpeg(dicom_data):
     """Convert DICOM pixel data to JPEG"""
     ds = pydicom.dcmread(io.BytesIO(dicom_data))
@@ -56,267 +105,386 @@ def convert_dicom_to_jpeg(dicom_data):
     
     print(f"DICOM pixel array shape: {pixel_array.shape}, dtype: {pixel_array.dtype}")
     
-    # Normalize to 0-255 range
-    pixel_array = pixel_array.astype(float)
-    pixel_min = np.min(pixel_array)
-    pixel_max = np.max(pixel_array)
-    
-    print(f"Pixel value range: {pixel_min} to {pixel_max}")
-    
-    if pixel_max > pixel_min:
-        pixel_array = (pixel_array - pixel_min) / (pixel_max - pixel_min)
-        pixel_array = (pixel_array * 255).astype(np.uint8)
-    else:
-        pixel_array = np.zeros_like(pixel_array, dtype=np.uint8)
+    pixel_array = normalize_to_uint8(pixel_array)
     
-    # Convert to PIL Image
     if len(pixel_array.shape) == 2:
-        image = Image.fromarray(pixel_array, mode='L')
-        image = image.convert('RGB')
+        rgb_array = np.ascontiguousarray(np.broadcast_to(pixel_array[..., None], (*pixel_array.shape, 3)))
         print("Converted grayscale DICOM to RGB")
     else:
-        image = Image.fromarray(pixel_array, mode='RGB')
+        rgb_array = np.ascontiguousarray(pixel_array)
         print("Processing RGB DICOM image")
     
     # Convert to JPEG
-    output = io.BytesIO()
-    image.save(output, format='JPEG', quality=95)
-    output.seek(0)
+    if TURBOJPEG_SUPPORT:
+        jpeg_data = turbojpeg.encode(rgb_array, quality=95, pixel_format=TJPF_RGB, jpeg_subsample=TJSAMP_420)
+    else:
+        output = io.BytesIO()
+        Image.fromarray(rgb_array, mode='RGB').save(output, format='JPEG', quality=95)
+        jpeg_data = output.getvalue()
     
-    jpeg_size = len(output.getvalue())
-    print(f"Generated JPEG size: {jpeg_size} bytes")
+    print(f"Generated JPEG size: {len(jpeg_data)} bytes")
     
-    return output.getvalue()
+    return jpeg_data
 
 
-def resize_and_crop_to_png_bytes(image_bytes, target_size=(1024, 1024), crop_size=(512, 512)):
+def resize_and_crop_to_array(image_bytes, target_size=(1024, 1024), crop_size=(512, 512)):
     """Resize to target_size, then crop to crop_size keeping the upper half and middle horizontally.
 
-    Returns PNG bytes suitable for classifier input.
+    Returns the crop as an HxWx3 uint8 array suitable for classifier input.
     """
     with io.BytesIO(image_bytes) as buf:
         img = Image.open(buf).convert('RGB')
+        return np.asarray(resize_and_crop(img, target_size, crop_size))
 
-        # Resize to 1024x1024
-        img = img.resize(target_size, Image.LANCZOS)
-
-        # Calculate crop box: upper half (y=0..crop_h) and centered horizontally
-        width, height = img.size
-        crop_w, crop_h = crop_size
-        left = (width - crop_w) // 2
-        upper = 0
-        right = left + crop_w
-        lower = upper + crop_h
-
-        cropped = img.crop((left, upper, right, lower))
 
-        out = io.BytesIO()
-        # Save as PNG for classifier input
-        cropped.save(out, format='PNG')
-        out.seek(0)
-        return out.getvalue()
+def array_to_png_bytes(arr):
+    """Encode an image array as PNG bytes"""
+    out = io.BytesIO()
+    Image.fromarray(arr).save(out, format='PNG')
+    return out.getvalue()
 
 
-def run_classifier_on_png(png_bytes):
+def run_classifier_on_array(arr):
     """Simple placeholder classifier that returns 1 or 0.
 
     Current behavior: convert to grayscale, compute average brightness; return 1 if avg>127 else 0.
     Replace with a real model call as needed.
     """
     try:
-        with io.BytesIO(png_bytes) as buf:
-            img = Image.open(buf).convert('L')
-            # Downscale for quick processing
-            img_small = img.resize((64, 64))
-            pixels = list(img_small.getdata())
-            avg = sum(pixels) / len(pixels)
-            return 1 if avg > 127 else 0
+        if arr.ndim == 3:
+            # Mean grayscale brightness using the same ITU-R 601-2 luma weights as PIL's convert('L')
+            avg = float(np.dot(arr.mean(axis=(0, 1)), (0.299, 0.587, 0.114)))
+        else:
+            avg = float(arr.mean())
+        return 1 if avg > 127 else 0
     except Exception as e:
         print(f"Classifier error: {e}")
         return 0
 
-def lambda_handler(event, context):
-    job_id = None
-    try:
-        record = event['Records'][0]
-        bucket = record['s3']['bucket']['name']
-        key = urllib.parse.unquote_plus(record['s3']['object']['key'])
-        
-        job_id = key.split('/')[1]
-        
-        print(f"Processing file: {key} for job: {job_id}")
-        print(f"DICOM support available: {DICOM_SUPPORT}")
-        
-        image_url = None
-        
-        # Check if it's a DICOM file
-        if is_dicom_file(key):
-            if not DICOM_SUPPORT:
-                raise Exception("DICOM processing not available. pydicom library not installed.")
-            
-            print("DICOM file detected - converting to JPEG for analysis")
-            
-            response = s3_client.get_object(Bucket=bucket, Key=key)
-            dicom_data = response['Body'].read()
-            print(f"Downloaded DICOM file: {len(dicom_data)} bytes")
-            
-            jpeg_data = convert_dicom_to_jpeg(dicom_data)
-            
-            converted_key = f"converted/{job_id}/converted.jpg"
-            s3_client.put_object(
-                Bucket=bucket,
-                Key=converted_key,
-                Body=jpeg_data,
-                ContentType='image/jpeg'
-            )
-            
-            print(f"Converted DICOM to JPEG and saved: {converted_key}")
-            
-            # Generate presigned URL for viewing
-            image_url = s3_client.generate_presigned_url(
-                'get_object',
-                Params={
-                    'Bucket': bucket,
-                    'Key': converted_key
-                },
-                ExpiresIn=3600
-            )
-            
-            rekognition_key = converted_key
+def is_sqs_event(event):
+    """Check if the event is an SQS batch (S3 notifications delivered through a queue)"""
+    return any(record.get('eventSource') == 'aws:sqs' for record in event.get('Records', []))
+
+def iter_s3_records(event, failed_message_ids):
+    """Yield (messageId, S3 record) pairs, unwrapping SQS messages that carry S3 notifications.
+
+    messageId is None for records delivered directly by S3. SQS messages whose body cannot be parsed are
+    appended to failed_message_ids and skipped.
+    """
+    for record in event.get('Records', []):
+        if record.get('eventSource') == 'aws:sqs':
+            try:
+                s3_records = json.loads(record['body']).get('Records', [])
+            except (ValueError, AttributeError) as e:
+                print(f"Malformed SQS message {record['messageId']}: {e}")
+                failed_message_ids.append(record['messageId'])
+                continue
+            for s3_record in s3_records:
+                yield record['messageId'], s3_record
         else:
-            print("Processing regular image file")
-            rekognition_key = key
-        
-        # Call Rekognition
-        print(f"Analyzing with Rekognition: {rekognition_key}")
-        
-        response = rekognition.detect_labels(
-            Image={
-                'S3Object': {
-                    'Bucket': bucket,
-                    'Name': rekognition_key
-                }
+            yield None, record
+
+def detect_labels(bucket, key, image_bytes=None, upload_future=None):
+    """Run Rekognition on in-memory image bytes if small enough, else on the S3 object.
+
+    Returns the response converted for DynamoDB.
+    """
+    if image_bytes is not None and len(image_bytes) <= REKOGNITION_MAX_IMAGE_BYTES:
+        print(f"Analyzing with Rekognition: converted JPEG bytes for {key}")
+        image = {'Bytes': image_bytes}
+    else:
+        if upload_future is not None:
+            # Rekognition reads from S3, so the converted JPEG must be stored first
+            upload_future.result()
+        print(f"Analyzing with Rekognition: {key}")
+        image = {
+            'S3Object': {
+                'Bucket': bucket,
+                'Name': key
+            }
+        }
+
+    response = rekognition.detect_labels(
+        Image=image,
+        MaxLabels=20,
+        MinConfidence=70
+    )
+
+    print(f"Rekognition found {len(response['Labels'])} labels")
+
+    return convert_floats_to_decimals(response)
+
+def start_job(job):
+    """Download the upload, convert DICOM to JPEG and start the S3 upload and Rekognition call in the background"""
+    bucket = job['bucket']
+    key = job['key']
+
+    # Check if it's a DICOM file
+    if is_dicom_file(key):
+        if not DICOM_SUPPORT:
+            raise Exception("DICOM processing not available. pydicom library not installed.")
+
+        print("DICOM file detected - converting to JPEG for analysis")
+
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+        dicom_data = response['Body'].read()
+        print(f"Downloaded DICOM file: {len(dicom_data)} bytes")
+
+        jpeg_data = convert_dicom_to_jpeg(dicom_data)
+
+        # Upload the converted JPEG for the viewer in the background; Rekognition reads the in-memory bytes
+        converted_key = f"converted/{job['jobId']}/converted.jpg"
+        job['convertedKey'] = converted_key
+        job['imageBytes'] = jpeg_data
+        job['uploadFuture'] = executor.submit(
+            s3_client.put_object,
+            Bucket=bucket,
+            Key=converted_key,
+            Body=jpeg_data,
+            ContentType='image/jpeg'
+        )
+
+        # Generate presigned URL for viewing
+        job['imageUrl'] = s3_client.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': bucket,
+                'Key': converted_key
             },
-            MaxLabels=20,
-            MinConfidence=70
+            ExpiresIn=3600
         )
-        
-        print(f"Rekognition found {len(response['Labels'])} labels")
-        
-        results = convert_floats_to_decimals(response)
 
-        # Run classifier on the converted image (prefer converted JPEG if available)
-        cropped_image_url = None
-        try:
-            classifier_input_bytes = None
-            if is_dicom_file(key):
-                classifier_input_bytes = jpeg_data
-            else:
-                obj = s3_client.get_object(Bucket=bucket, Key=rekognition_key)
-                classifier_input_bytes = obj['Body'].read()
-
-            # Convert to PNG, resize and crop
-            png_bytes = resize_and_crop_to_png_bytes(classifier_input_bytes)
-
-            # Save cropped PNG to S3
-            cropped_key = f"cropped/{job_id}/cropped.png"
-            s3_client.put_object(
-                Bucket=bucket,
+        rekognition_key = converted_key
+    else:
+        print("Processing regular image file")
+        rekognition_key = key
+
+    job['rekognitionFuture'] = executor.submit(
+        detect_labels, bucket, rekognition_key, job['imageBytes'], job['uploadFuture']
+    )
+
+def crop_for_classifier(job):
+    """Resize and crop the job's image and start uploading the crop to S3.
+
+    Prefers the converted JPEG already in memory. Returns the cropped array, or None on failure.
+    """
+    try:
+        image_bytes = job['imageBytes']
+        if image_bytes is None:
+            obj = s3_client.get_object(Bucket=job['bucket'], Key=job['key'])
+            image_bytes = obj['Body'].read()
+
+        # Resize and crop; the classifier consumes the decoded array directly
+        cropped = resize_and_crop_to_array(image_bytes)
+
+        # Save cropped PNG to S3 while the classifier runs
+        cropped_key = f"cropped/{job['jobId']}/cropped.png"
+        job['croppedKey'] = cropped_key
+        job['croppedFuture'] = executor.submit(
+            lambda: s3_client.put_object(
+                Bucket=job['bucket'],
                 Key=cropped_key,
-                Body=png_bytes,
+                Body=array_to_png_bytes(cropped),
                 ContentType='image/png'
             )
-            print(f"Saved cropped image to: {cropped_key}")
+        )
+        return cropped
+    except Exception as e:
+        print(f"Classifier processing failed for job {job['jobId']}: {e}")
+        return None
+
+def classify_crops(crops):
+    """Classify all crops in one model call, falling back to the heuristic. Returns one flag per crop."""
+    if not crops:
+        return []
+
+    # Prefer the provided model classifier if available
+    try:
+        if classify_arrays is None:
+            raise ImportError("inference.classify_image could not be imported")
+        predicted_classes = classify_arrays(crops)
+        # Map predicted class to flag (if model outputs 0/1 already, keep it)
+        flags = [int(c) for c in predicted_classes]
+        print(f"Model classifier returned classes: {predicted_classes}")
+    except Exception as model_exc:
+        print(f"Model classifier not available or failed: {model_exc}; falling back to heuristic")
+        flags = [run_classifier_on_array(cropped) for cropped in crops]
+        print(f"Heuristic classifier returned flags: {flags}")
+    return flags
+
+def wait_for_job_futures(job):
+    """Block until every background task submitted for the job has finished, successfully or not"""
+    wait([job[name] for name in ('uploadFuture', 'rekognitionFuture', 'croppedFuture') if job.get(name) is not None])
+
+def finish_job(job, flag_value):
+    """Wait for the job's background work and store results, image URLs and flag in DynamoDB"""
+    try:
+        store_job_results(job, flag_value)
+    finally:
+        wait_for_job_futures(job)
+
+def store_job_results(job, flag_value):
+    """Collect the job's background results and write them to DynamoDB"""
+    results = job['rekognitionFuture'].result()
+
+    if job['uploadFuture'] is not None:
+        job['uploadFuture'].result()
+        print(f"Converted DICOM to JPEG and saved: {job['convertedKey']}")
+
+    cropped_image_url = None
+    if job['croppedFuture'] is not None:
+        try:
+            job['croppedFuture'].result()
+            print(f"Saved cropped image to: {job['croppedKey']}")
 
             # Generate presigned URL for the cropped image
             cropped_image_url = s3_client.generate_presigned_url(
                 'get_object',
                 Params={
-                    'Bucket': bucket,
-                    'Key': cropped_key
+                    'Bucket': job['bucket'],
+                    'Key': job['croppedKey']
                 },
                 ExpiresIn=3600
             )
-
-            # Prefer the provided model classifier if available
-            try:
-                from inference.classify_image import classify_png_bytes
-                predicted_class = classify_png_bytes(png_bytes)
-                # Map predicted class to flag (if model outputs 0/1 already, keep it)
-                flag_value = int(predicted_class)
-                print(f"Model classifier returned class: {predicted_class}")
-            except Exception as model_exc:
-                print(f"Model classifier not available or failed: {model_exc}; falling back to heuristic")
-                flag_value = run_classifier_on_png(png_bytes)
-                print(f"Heuristic classifier returned flag: {flag_value}")
-
         except Exception as e:
             print(f"Classifier processing failed: {e}")
             flag_value = 0
 
-        # Update DynamoDB with results, image URL and flag
-        table = dynamodb.Table(TABLE_NAME)
-        update_expression = 'SET #status = :status, #results = :results, #updatedAt = :updatedAt, #flag = :flag'
-        expression_names = {
-            '#status': 'status',
-            '#results': 'results',
-            '#updatedAt': 'updatedAt',
-            '#flag': 'flag'
-        }
-        expression_values = {
-            ':status': 'complete',
-            ':results': results,
-            ':updatedAt': datetime.utcnow().isoformat(),
-            ':flag': Decimal(str(int(flag_value)))
-        }
+    # Update DynamoDB with results, image URL and flag
+    table = dynamodb.Table(TABLE_NAME)
+    update_expression = 'SET #status = :status, #results = :results, #updatedAt = :updatedAt, #flag = :flag'
+    expression_names = {
+        '#status': 'status',
+        '#results': 'results',
+        '#updatedAt': 'updatedAt',
+        '#flag': 'flag'
+    }
+    expression_values = {
+        ':status': 'complete',
+        ':results': results,
+        ':updatedAt': datetime.now(timezone.utc).isoformat(),
+        ':flag': Decimal(str(int(flag_value)))
+    }
 
-        # Add imageUrl if it's a DICOM
-        if image_url:
-            update_expression += ', #imageUrl = :imageUrl'
-            expression_names['#imageUrl'] = 'imageUrl'
-            expression_values[':imageUrl'] = image_url
-
-        # Add croppedImageUrl if available
-        if cropped_image_url:
-            update_expression += ', #croppedImageUrl = :croppedImageUrl'
-            expression_names['#croppedImageUrl'] = 'croppedImageUrl'
-            expression_values[':croppedImageUrl'] = cropped_image_url
-
-        table.update_item(
-            Key={'jobId': job_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeNames=expression_names,
-            ExpressionAttributeValues=expression_values
-        )
-        
-        print("Successfully saved results to DynamoDB")
-        
+    # Add imageUrl if it's a DICOM
+    if job['imageUrl']:
+        update_expression += ', #imageUrl = :imageUrl'
+        expression_names['#imageUrl'] = 'imageUrl'
+        expression_values[':imageUrl'] = job['imageUrl']
+
+    # Add croppedImageUrl if available
+    if cropped_image_url:
+        update_expression += ', #croppedImageUrl = :croppedImageUrl'
+        expression_names['#croppedImageUrl'] = 'croppedImageUrl'
+        expression_values[':croppedImageUrl'] = cropped_image_url
+
+    table.update_item(
+        Key={'jobId': job['jobId']},
+        UpdateExpression=update_expression,
+        ExpressionAttributeNames=expression_names,
+        ExpressionAttributeValues=expression_values
+    )
+
+    print(f"Successfully saved results to DynamoDB for job: {job['jobId']}")
+
+def record_job_error(job_id, e):
+    """Log a failed job and mark it as errored in DynamoDB"""
+    print(f"Error: {str(e)}")
+    import traceback
+    print(f"Traceback: {traceback.format_exc()}")
+
+    if job_id:
+        try:
+            table = dynamodb.Table(TABLE_NAME)
+            table.update_item(
+                Key={'jobId': job_id},
+                UpdateExpression='SET #status = :status, #error = :error',
+                ExpressionAttributeNames={
+                    '#status': 'status',
+                    '#error': 'error'
+                },
+                ExpressionAttributeValues={
+                    ':status': 'error',
+                    ':error': str(e)
+                }
+            )
+        except:
+            pass
+
+def lambda_handler(event, context):
+    """Process every S3 record in the event; all crops go through the classifier as one batch.
+
+    For SQS events, failed messages are returned as batchItemFailures (requires ReportBatchItemFailures on
+    the event source mapping) so only those are retried. Direct S3 events re-raise the error.
+    """
+    print(f"DICOM support available: {DICOM_SUPPORT}")
+
+    jobs = []
+    errors = []
+    failed_message_ids = []
+
+    for message_id, record in iter_s3_records(event, failed_message_ids):
+        job_id = None
+        job = None
+        try:
+            bucket = record['s3']['bucket']['name']
+            key = urllib.parse.unquote_plus(record['s3']['object']['key'])
+            job_id = key.split('/')[1]
+
+            print(f"Processing file: {key} for job: {job_id}")
+
+            job = {
+                'jobId': job_id,
+                'messageId': message_id,
+                'bucket': bucket,
+                'key': key,
+                'imageBytes': None,
+                'imageUrl': None,
+                'convertedKey': None,
+                'uploadFuture': None,
+                'croppedKey': None,
+                'croppedFuture': None,
+            }
+            start_job(job)
+            jobs.append(job)
+        except Exception as e:
+            if job is not None:
+                # Don't leave an already submitted upload running past the handler
+                wait_for_job_futures(job)
+            record_job_error(job_id, e)
+            errors.append(e)
+            failed_message_ids.append(message_id)
+
+    # Crop concurrently, then run the classifier once over the whole batch
+    crops = list(executor.map(crop_for_classifier, jobs))
+    classified = [i for i, cropped in enumerate(crops) if cropped is not None]
+    flags = [0] * len(jobs)
+    for i, flag_value in zip(classified, classify_crops([crops[i] for i in classified])):
+        flags[i] = flag_value
+
+    for job, flag_value in zip(jobs, flags):
+        try:
+            finish_job(job, flag_value)
+        except Exception as e:
+            record_job_error(job['jobId'], e)
+            errors.append(e)
+            failed_message_ids.append(job['messageId'])
+
+    if errors:
+        print(f"{len(errors)} job(s) failed")
+
+    if is_sqs_event(event):
+        # Report only the failed messages so successful jobs are not reprocessed
         return {
-            'statusCode': 200,
-            'body': json.dumps({'message': 'Processing complete'})
+            'batchItemFailures': [
+                {'itemIdentifier': message_id} for message_id in dict.fromkeys(failed_message_ids)
+            ]
         }
-        
-    except Exception as e:
-        print(f"Error: {str(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
-        
-        if job_id:
-            try:
-                table = dynamodb.Table(TABLE_NAME)
-                table.update_item(
-                    Key={'jobId': job_id},
-                    UpdateExpression='SET #status = :status, #error = :error',
-                    ExpressionAttributeNames={
-                        '#status': 'status',
-                        '#error': 'error'
-                    },
-                    ExpressionAttributeValues={
-                        ':status': 'error',
-                        ':error': str(e)
-                    }
-                )
-            except:
-                pass
-        
-        raise e
\ No newline at end of file
+
+    if errors:
+        raise errors[0]
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({'message': 'Processing complete'})
+    }
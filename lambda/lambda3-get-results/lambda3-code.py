@@ -8,19 +8,29 @@ import boto3
 import os
 from decimal import Decimal
 
+# Optional fast JSON encoder (falls back to the standard library)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 dynamodb = boto3.resource('dynamodb')
 TABLE_NAME = os.environ.get('TABLE_NAME', 'ImageAnalysisResults')
 
-def convert_decimals_to_floats(obj):
-    """Convert Decimals back to floats for JSON serialization"""
-    if isinstance(obj, list):
-        return [convert_decimals_to_floats(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: convert_decimals_to_floats(value) for key, value in obj.items()}
-    elif isinstance(obj, Decimal):
+# Response fields; callers may request a subset with ?fields=status,flag (e.g. while polling)
+RESPONSE_FIELDS = ('status', 'results', 'imageUrl', 'croppedImageUrl', 'flag', 'error')
+
+def decimal_to_float(obj):
+    """JSON encoder hook: convert DynamoDB Decimals to floats"""
+    if isinstance(obj, Decimal):
         return float(obj)
-    else:
-        return obj
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps_with_decimals(obj):
+    """Serialize a DynamoDB item to JSON, converting Decimals to floats inside the encoder"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=decimal_to_float).decode('utf-8')
+    return json.dumps(obj, default=decimal_to_float)
 
 def lambda_handler(event, context):
     print(f"Event received: {json.dumps(event)}")
@@ -45,11 +55,33 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'Missing jobId parameter'})
             }
         
-        print(f"Getting results for job: {job_id}")
+        fields_param = event['queryStringParameters'].get('fields')
+        if fields_param:
+            # De-duplicate, keeping order: DynamoDB rejects overlapping paths in a ProjectionExpression
+            fields = list(dict.fromkeys(field.strip() for field in fields_param.split(',') if field.strip()))
+            unknown_fields = [field for field in fields if field not in RESPONSE_FIELDS]
+            if unknown_fields:
+                print(f"ERROR: Unknown fields requested: {unknown_fields}")
+                return {
+                    'statusCode': 400,
+                    'headers': {'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': f"Unknown fields: {', '.join(unknown_fields)}"})
+                }
+            # status is always returned
+            if 'status' not in fields:
+                fields.insert(0, 'status')
+        else:
+            fields = list(RESPONSE_FIELDS)
+        
+        print(f"Getting results for job: {job_id} (fields: {', '.join(fields)})")
         
-        # Query DynamoDB
+        # Query DynamoDB, fetching only the requested attributes
         table = dynamodb.Table(TABLE_NAME)
-        response = table.get_item(Key={'jobId': job_id})
+        get_item_args = {'Key': {'jobId': job_id}}
+        if fields_param:
+            get_item_args['ProjectionExpression'] = ', '.join(f"#{field}" for field in fields)
+            get_item_args['ExpressionAttributeNames'] = {f"#{field}": field for field in fields}
+        response = table.get_item(**get_item_args)
         
         print(f"DynamoDB response: {response}")
         
@@ -64,24 +96,12 @@ def lambda_handler(event, context):
         item = response['Item']
         print(f"Found item with status: {item.get('status')}")
         
-        # Convert Decimals to floats for JSON
-        results = convert_decimals_to_floats(item.get('results'))
+        response_body = {field: item.get(field) for field in fields}
         
         # Convert flag Decimal to int if present
-        flag_val = item.get('flag')
+        flag_val = response_body.get('flag')
         if isinstance(flag_val, Decimal):
-            flag_out = int(flag_val)
-        else:
-            flag_out = flag_val
-
-        response_body = {
-            'status': item['status'],
-            'results': results,
-            'imageUrl': item.get('imageUrl'),
-            'croppedImageUrl': item.get('croppedImageUrl'),
-            'flag': flag_out,
-            'error': item.get('error')
-        }
+            response_body['flag'] = int(flag_val)
         
         print(f"Returning response with status: {item['status']}")
         
@@ -92,7 +112,7 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Headers': 'Content-Type',
                 'Access-Control-Allow-Methods': 'GET'
             },
-            'body': json.dumps(response_body)
+            'body': dumps_with_decimals(response_body)
         }
         
     except Exception as e:
@@ -21,10 +21,18 @@ fi
 
 echo "✅ Docker found"
 
+# Target Lambda architecture: arm64 (Graviton, default) or x86_64
+ARCH=${ARCH:-arm64}
+if [ "$ARCH" = "arm64" ]; then
+    PLATFORM=linux/arm64
+else
+    PLATFORM=linux/amd64
+fi
+
 # Build with Docker for Linux compatibility
 echo "📦 Installing Python packages..."
 docker run --rm \
-    --platform linux/amd64 \
+    --platform $PLATFORM \
     -v $(pwd):/var/task \
     -w /var/task \
     --entrypoint /bin/bash \
@@ -73,5 +81,5 @@ echo "   aws lambda publish-layer-version \\"
 echo "       --layer-name pydicom-layer \\"
 echo "       --content S3Bucket=YOUR-BUCKET,S3Key=layers/dicom-layer.zip \\"
 echo "       --compatible-runtimes python3.12 \\"
-echo "       --compatible-architectures x86_64"
+echo "       --compatible-architectures $ARCH"
 echo ""
\ No newline at end of file
@@ -21,13 +21,21 @@ fi
 
 echo "✅ Docker found"
 
+# Target Lambda architecture: arm64 (Graviton, default) or x86_64
+ARCH=${ARCH:-arm64}
+if [ "$ARCH" = "arm64" ]; then
+    PLATFORM=linux/arm64
+else
+    PLATFORM=linux/amd64
+fi
+
 # Build with Docker for Linux compatibility
 echo "📦 Installing TensorFlow (this may take several minutes)..."
 echo "Note: TensorFlow is large (~300MB compressed, ~900MB uncompressed)"
 echo ""
 
 docker run --rm \
-    --platform linux/amd64 \
+    --platform $PLATFORM \
     -v $(pwd):/var/task \
     -w /var/task \
     --entrypoint /bin/bash \
@@ -98,7 +106,7 @@ echo "       --layer-name tensorflow-layer \\"
 echo "       --description \"TensorFlow 2.18.0 for ML inference\" \\"
 echo "       --content S3Bucket=YOUR-BUCKET,S3Key=layers/tensorflow-layer.zip \\"
 echo "       --compatible-runtimes python3.12 \\"
-echo "       --compatible-architectures x86_64"
+echo "       --compatible-architectures $ARCH"
 echo ""
 echo "3. Attach both layers to your Lambda function:"
 echo "   aws lambda update-function-configuration \\"
@@ -0,0 +1,117 @@
+#!/bin/bash
+
+# Build Lambda Layer for TFLite Inference
+# Creates a Lambda layer with the standalone TFLite runtime (ai-edge-litert, the successor of
+# tflite_runtime) for running the converted classifier model without full TensorFlow.
+# The .tflite model(s) from ../models are included under models/ (mounted at /opt/models), where the
+# interpreter memory-maps them instead of reading them into the function's memory.
+# inference/classify_image.py is included as python/inference/ so zip-deployed Lambda2 can import it.
+
+set -e  # Exit on error
+
+echo "🏗️  Building Lambda Layer for TFLite Inference"
+echo "==============================================="
+
+# Clean up old files
+echo "Cleaning up old files..."
+rm -f tflite-layer.zip
+rm -rf python models
+
+# Check if Docker is available
+if ! command -v docker &> /dev/null; then
+    echo "❌ Docker not found. Please install Docker first."
+    exit 1
+fi
+
+echo "✅ Docker found"
+
+# Target Lambda architecture: arm64 (Graviton, default) or x86_64
+ARCH=${ARCH:-arm64}
+if [ "$ARCH" = "arm64" ]; then
+    PLATFORM=linux/arm64
+else
+    PLATFORM=linux/amd64
+fi
+
+# Build with Docker for Linux compatibility
+echo "📦 Installing TFLite runtime..."
+docker run --rm \
+    --platform $PLATFORM \
+    -v $(pwd):/var/task \
+    -w /var/task \
+    --entrypoint /bin/bash \
+    public.ecr.aws/lambda/python:3.12 \
+    -c "pip install --target python ai-edge-litert==1.2.0 --no-cache-dir"
+
+if [ $? -ne 0 ]; then
+    echo "❌ Failed to install TFLite runtime"
+    exit 1
+fi
+
+echo "✅ TFLite runtime installed"
+
+# Check if python directory exists
+if [ ! -d "python" ]; then
+    echo "❌ Error: python directory not created"
+    exit 1
+fi
+
+# numpy is already provided by the pydicom layer
+rm -rf python/numpy python/numpy-* python/numpy.libs
+
+# Add the classifier module (imported by Lambda2 as inference.classify_image; loads the model from /opt/models)
+mkdir -p python/inference
+cp ../inference/classify_image.py python/inference/
+echo "✅ Classifier module added"
+
+# Remove unnecessary files to reduce size
+find python -type d -name "__pycache__" -exec rm -rf {} + 2>/dev/null || true
+
+# Add the converted model(s)
+if ! ls ../models/*.tflite &> /dev/null; then
+    echo "❌ No .tflite model found in ../models. Run inference/convert_to_tflite.py first."
+    exit 1
+fi
+mkdir -p models
+cp ../models/*.tflite models/
+echo "✅ Models added: $(ls models)"
+
+# Create zip file
+echo "📦 Creating zip file..."
+zip -r9 tflite-layer.zip python/ models/
+
+if [ $? -ne 0 ]; then
+    echo "❌ Failed to create zip file"
+    exit 1
+fi
+
+# Get zip file size
+ZIP_SIZE=$(du -h tflite-layer.zip | cut -f1)
+echo "✅ Zip file created: tflite-layer.zip ($ZIP_SIZE)"
+
+# Clean up
+echo "🧹 Cleaning up..."
+rm -rf python models
+
+echo ""
+echo "✅ TFLite Lambda layer built successfully!"
+echo ""
+echo "Next steps:"
+echo "1. Upload to S3:"
+echo "   aws s3 cp tflite-layer.zip s3://YOUR-BUCKET/layers/"
+echo ""
+echo "2. Create Lambda layer:"
+echo "   aws lambda publish-layer-version \\"
+echo "       --layer-name tflite-layer \\"
+echo "       --description \"TFLite runtime (XNNPACK), classifier module and model for ML inference\" \\"
+echo "       --content S3Bucket=YOUR-BUCKET,S3Key=layers/tflite-layer.zip \\"
+echo "       --compatible-runtimes python3.12 \\"
+echo "       --compatible-architectures $ARCH"
+echo ""
+echo "3. Attach both layers to your Lambda function:"
+echo "   aws lambda update-function-configuration \\"
+echo "       --function-name processImage \\"
+echo "       --layers \\"
+echo "           arn:aws:lambda:REGION:ACCOUNT:layer:pydicom-layer:VERSION \\"
+echo "           arn:aws:lambda:REGION:ACCOUNT:layer:tflite-layer:VERSION"
+echo ""